@@ -115,8 +115,6 @@ def measure_same_under_knockouts(
         for algo_key, algo_ko_ps in (algo_pbar := tqdm(algos_ko_ps.items())):
             algo = PRUNE_ALGO_DICT[algo_key]
             algo_pbar.set_description_str(f"Algo: {algo.name}")
-            print()
-            print("task", task.name, "algo", algo.name)
             same_under_knockouts: CompletenessScores = same_under_knockout(
                 task=task,
                 circuit_ps=circuit_ps[task_key][algo_key],
@@ -172,6 +170,7 @@ def same_under_knockout(
     mask_params = list(patch_masks.values())
     # Make a boolean copy of the patch_masks that encodes the circuit
     circ_masks = [circuit_ps[m].abs() >= circuit_threshold for m in patch_masks.keys()]
+    not_circ_masks = [~circ for circ in circ_masks]
     actual_circuit_size: int = int(sum([mask.sum().item() for mask in circ_masks]))
     knockout_masks = [knockout_ps[m] >= knockout_threshold for m in patch_masks.keys()]
     # assert actual_circuit_size == circuit_size
@@ -181,35 +180,37 @@ def same_under_knockout(
     circ_logprobs, model_logprobs = {}, {}
     with t.no_grad():
         # Discretize the circuit with knockouts
-        for circ, knockout, patch in zip(circ_masks, knockout_masks, mask_params):
+        for not_circ, knockout, patch in zip(
+            not_circ_masks, knockout_masks, mask_params
+        ):
             # Patch edges where learned mask is greater than knockout_threshold
-            patch.data = knockout.float()
+            patch.data.copy_(knockout)
             # Also patch edges not in the circuit
-            t.where(circ, patch.data, t.ones_like(patch.data), out=patch.data)
+            patch.data.masked_fill_(not_circ, 1.0)
         # Test the circuit with the knockouts
         for batch in task.test_loader:
-            patch_outs = corrupt_src_outs[batch.key].clone().detach()
+            patch_outs = corrupt_src_outs[batch.key]
             with patch_mode(model, patch_outs):
                 model_out = model(batch.clean)[model.out_slice]
                 ko_circ_logprobs[batch.key] = log_softmax(model_out, dim=-1)
 
         # Test the full model with the same knockouts
-        for circ, patch in zip(circ_masks, mask_params):
+        for not_circ, patch in zip(not_circ_masks, mask_params):
             # Don't patch edges not in the circuit (but keep patches in the circuit)
-            t.where(circ, patch.data, t.zeros_like(patch.data), out=patch.data)
+            patch.data.masked_fill_(not_circ, 0.0)
         knockouts_size = int(sum([mask.sum().item() for mask in mask_params]))
         for batch in task.test_loader:
-            patch_outs = corrupt_src_outs[batch.key].clone().detach()
+            patch_outs = corrupt_src_outs[batch.key]
             with patch_mode(model, patch_outs):
                 model_out = model(batch.clean)[model.out_slice]
                 ko_model_logprobs[batch.key] = log_softmax(model_out, dim=-1)
 
         # Test the circuit without knockouts (with tree patching)
-        for circ, patch in zip(circ_masks, mask_params):
+        for not_circ, patch in zip(not_circ_masks, mask_params):
             # Patch every edge not in the circuit
-            patch.data = (~circ).float()
+            patch.data.copy_(not_circ)
         for batch in task.test_loader:
-            patch_outs = corrupt_src_outs[batch.key].clone().detach()
+            patch_outs = corrupt_src_outs[batch.key]
             with patch_mode(model, patch_outs):
                 model_out = model(batch.clean)[model.out_slice]
                 circ_logprobs[batch.key] = log_softmax(model_out, dim=-1)
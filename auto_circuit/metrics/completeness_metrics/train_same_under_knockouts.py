@@ -1,10 +1,15 @@
 import math
-from typing import Dict, List, Literal
+from typing import Dict, List, Literal, Tuple
 
 import plotly.graph_objects as go
 import torch as t
 from torch.nn.functional import log_softmax
+from transformer_lens.past_key_value_caching import (
+    HookedTransformerKeyValueCache,
+    HookedTransformerKeyValueCacheEntry,
+)
 
+from auto_circuit.data import PromptPairBatch
 from auto_circuit.prune_algos.prune_algos import PRUNE_ALGO_DICT, PruneAlgo
 from auto_circuit.tasks import TASK_DICT, Task
 from auto_circuit.types import (
@@ -19,6 +24,7 @@ from auto_circuit.types import (
 from auto_circuit.utils.ablation_activations import batch_src_ablations
 from auto_circuit.utils.custom_tqdm import tqdm
 from auto_circuit.utils.graph_utils import (
+    batch_mask_mode,
     mask_fn_mode,
     patch_mode,
     set_all_masks,
@@ -81,6 +87,29 @@ p = (mask_p - left) / (right - left)
 init_mask_val = math.log(p / (1 - p))
 
 
+def doubled_kv_cache(
+    kv_cache: HookedTransformerKeyValueCache,
+) -> HookedTransformerKeyValueCache:
+    """
+    Duplicate a frozen KV cache along the batch dimension, so that it can be used with
+    a batch made of two stacked copies of the original batch.
+    """
+    return HookedTransformerKeyValueCache(
+        entries=[
+            HookedTransformerKeyValueCacheEntry(
+                past_keys=t.cat([entry.past_keys, entry.past_keys], dim=0),
+                past_values=t.cat([entry.past_values, entry.past_values], dim=0),
+                frozen=True,
+            )
+            for entry in kv_cache.entries
+        ],
+        previous_attention_mask=t.cat(
+            [kv_cache.previous_attention_mask, kv_cache.previous_attention_mask], dim=0
+        ),
+        frozen=True,
+    )
+
+
 def train_same_under_knockout_prune_scores(
     task: Task,
     algo: PruneAlgo,
@@ -91,6 +120,7 @@ def train_same_under_knockout_prune_scores(
     regularize_lambda: float,
     mask_fn: MaskFn = "hard_concrete",
     faithfulness_target: Literal["kl_div", "logit_diff"] = "kl_div",
+    compile_step: bool = False,
 ) -> PruneScores:
     """
     Learn a subset of the circuit to ablate such that when the same edges are ablated
@@ -116,6 +146,9 @@ def train_same_under_knockout_prune_scores(
         faithfulness_target: The target for the faithfulness term in the loss. The
             optimizer will try to maximize the difference in this target between the
             knocked-out circuit and the knocked-out full model.
+        compile_step: Whether to wrap the training step (forward pass and loss) in
+            `torch.compile`. This can reduce op-dispatch overhead but adds compilation
+            latency on the first step and may not support all wrapped models.
 
     Returns:
         The learned ordering of edges to knockout.
@@ -138,55 +171,100 @@ def train_same_under_knockout_prune_scores(
 
         # Make a boolean copy of the patch_masks that encodes the circuit
         circ_masks = [algo_ps[m].abs() >= circuit_threshold for m in patch_masks.keys()]
-        actual_circuit_size = sum([mask.sum().item() for mask in circ_masks])
-        print("actual_circuit_size", actual_circuit_size, "circuit_size", circuit_size)
+        # actual_circuit_size = sum([mask.sum().item() for mask in circ_masks])
         # assert actual_circuit_size == circuit_size
 
         set_all_masks(model, val=-init_mask_val)
         optim = t.optim.Adam(mask_params, lr=learning_rate)
+
+        # The circuit pass and the full model pass share the learned mask values on the
+        # circuit edges and only differ outside the circuit: the circuit pass patches
+        # all non-circuit edges (mask 99 -> 1) and the full model pass patches none of
+        # them (mask -99 -> 0). Stacking the two configurations (and the input) along
+        # the batch dimension computes both outputs with a single forward pass.
+        not_circ_masks = [~circ for circ in circ_masks]
+        if model.kv_caches is not None:
+            for batch_size, kv_cache in list(model.kv_caches.items()):
+                if 2 * batch_size not in model.kv_caches:
+                    model.kv_caches[2 * batch_size] = doubled_kv_cache(kv_cache)
+
+        def step(
+            doubled_clean: t.Tensor,
+            batch_masks: Dict[str, t.Tensor],
+            batch: PromptPairBatch,
+        ) -> Tuple[t.Tensor, t.Tensor, t.Tensor]:
+            # Run the forward pass in bf16 on GPU, but compute the loss in fp32
+            device_type = doubled_clean.device.type
+            autocast_ctx = t.autocast(
+                device_type, dtype=t.bfloat16, enabled=device_type == "cuda"
+            )
+            with autocast_ctx, batch_mask_mode(model, batch_masks):
+                out = model(doubled_clean)[model.out_slice]
+            circ_out, model_out = out.float().chunk(2, dim=0)
+            if faithfulness_target == "kl_div":
+                circuit_logprobs = log_softmax(circ_out, dim=-1)
+                model_logprobs = log_softmax(model_out, dim=-1)
+                faith = -multibatch_kl_div(circuit_logprobs, model_logprobs)
+            else:
+                assert faithfulness_target == "logit_diff"
+                circ_logit_diff = batch_avg_answer_diff(circ_out, batch)
+                model_logit_diff = batch_avg_answer_diff(model_out, batch)
+                faith = -(model_logit_diff - circ_logit_diff)
+            # Only circuit edges count towards the knockout budget. The sequential
+            # formulation discretized the masks in place before sampling, so
+            # non-circuit entries sat at -99 and sampled to exactly 0; here the raw
+            # mask values are left untouched, so force the non-circuit entries to
+            # -99 before sampling. Samples are elementwise independent, so sampling
+            # each mask separately avoids concatenating every mask tensor into a
+            # fresh buffer each step
+            knockouts_count = t.stack(
+                [
+                    sample_hard_concrete(m.masked_fill(nc, -99.0), batch_size=1).sum()
+                    for m, nc in zip(mask_params, not_circ_masks)
+                ]
+            ).sum()
+            reg_term = t.relu(knockouts_count - n_target) / n_target
+            loss = faith + reg_term * regularize_lambda
+            return loss, faith, reg_term
+
+        if compile_step:
+            step = t.compile(step, fullgraph=False, dynamic=False)
+
         for epoch in (epoch_pbar := tqdm(range(epochs))):
             kl_str = faith_history[-1] if len(faith_history) > 0 else None
             epoch_pbar.set_description_str(f"Epoch: {epoch}, KL Div: {kl_str}")
+            # Accumulate detached tensors and only sync with the GPU at epoch end
+            epoch_losses, epoch_faiths, epoch_regs = [], [], []
             for batch in task.test_loader:
-                patches = corrupt_src_outs[batch.key].clone().detach()
-                with patch_mode(model, patches), mask_fn_mode(model, mask_fn):
+                patches = corrupt_src_outs[batch.key]
+                doubled_patches = t.cat([patches, patches], dim=1)  # Batch dim is 1
+                doubled_clean = t.cat([batch.clean, batch.clean], dim=0)
+                half_consts = t.cat(
+                    [
+                        t.full((batch.clean.size(0),), 99.0, device=patches.device),
+                        t.full((batch.clean.size(0),), -99.0, device=patches.device),
+                    ]
+                )
+                with patch_mode(model, doubled_patches), mask_fn_mode(model, mask_fn):
                     optim.zero_grad()
                     model.zero_grad()
 
-                    # Patch all the edges not in the circuit
-                    with t.no_grad():
-                        for circ, patch in zip(circ_masks, mask_params):
-                            patch_all = t.full_like(patch.data, 99)
-                            t.where(circ, patch.data, patch_all, out=patch.data)
-                    circ_out = model(batch.clean)[model.out_slice]
-
-                    # Don't patch edges not in the circuit
-                    with t.no_grad():
-                        for cir, patch in zip(circ_masks, mask_params):
-                            patch_none = t.full_like(patch.data, -99)
-                            t.where(cir, patch.data, patch_none, out=patch.data)
-                    model_out = model(batch.clean)[model.out_slice]
-
-                    if faithfulness_target == "kl_div":
-                        circuit_logprobs = log_softmax(circ_out, dim=-1)
-                        model_logprobs = log_softmax(model_out, dim=-1)
-                        faith = -multibatch_kl_div(circuit_logprobs, model_logprobs)
-                    else:
-                        assert faithfulness_target == "logit_diff"
-                        circ_logit_diff = batch_avg_answer_diff(circ_out, batch)
-                        model_logit_diff = batch_avg_answer_diff(model_out, batch)
-                        faith = -(model_logit_diff - circ_logit_diff)
-                    faith_history.append(faith.item())
-
-                    flat_masks = t.cat([mask.flatten() for mask in mask_params])
-                    knockouts_samples = sample_hard_concrete(flat_masks, batch_size=1)
-                    reg_term = t.relu(knockouts_samples.sum() - n_target) / n_target
-                    reg_history.append(reg_term.item() * regularize_lambda)
-
-                    loss = faith + reg_term * regularize_lambda
+                    batch_masks: Dict[str, t.Tensor] = {}
+                    for (mod_name, patch), not_circ in zip(
+                        patch_masks.items(), not_circ_masks
+                    ):
+                        consts = half_consts.view(-1, *([1] * patch.ndim))
+                        batch_masks[mod_name] = t.where(not_circ, consts, patch)
+                    loss, faith, reg_term = step(doubled_clean, batch_masks, batch)
+                    epoch_faiths.append(faith.detach())
+                    epoch_regs.append(reg_term.detach() * regularize_lambda)
+
                     loss.backward()
-                    loss_history.append(loss.item())
+                    epoch_losses.append(loss.detach())
                     optim.step()
+            loss_history.extend(t.stack(epoch_losses).tolist())
+            faith_history.extend(t.stack(epoch_faiths).tolist())
+            reg_history.extend(t.stack(epoch_regs).tolist())
 
         fig = go.Figure()
         fig.add_trace(go.Scatter(y=loss_history, name="Loss"))
@@ -51,7 +51,6 @@ def train_model(
     n_epochs: int,
 ) -> AutoencoderTransformer:
     model.eval()
-    device = model.cfg.device
 
     autoencoder_model: AutoencoderTransformer = sae_model(
         model,
@@ -77,10 +76,12 @@ def train_model(
 
     loss_history, cross_entropy_loss_history, l1_loss_history = [], [], []
     for epoch in (epoch_pbar := tqdm(range(n_epochs))):
-        for batch in (batch_pbar := tqdm(dataloader)):
-            # toks = batch["input_ids"].to(device)
-            # mask = batch["attention_mask"].to(device)
-            toks = batch.clean.to(device)
+        # Accumulate detached tensors and only sync with the GPU at epoch end
+        epoch_losses, epoch_nlls, epoch_l1s = [], [], []
+        for batch in tqdm(dataloader):
+            # toks = batch["input_ids"]
+            # mask = batch["attention_mask"]
+            toks = batch.clean  # Already on the model's device
             autoencoder_model.reset_activated_latents(toks.shape[0], toks.shape[1])
             optim.zero_grad()
             with t.no_grad():
@@ -95,12 +96,17 @@ def train_model(
             loss.backward()
             optim.step()
 
-            loss_history.append(loss.item())
-            cross_entropy_loss_history.append(nll.item())
-            l1_loss_history.append(l1.item())
-            desc = f"Loss: {loss.item():.3f} NLL: {nll.item():.3f} L1: {l1.item():.3f}"
-            batch_pbar.set_description_str(desc)
-            epoch_pbar.set_description_str(f"Epoch: {epoch} " + desc)
+            epoch_losses.append(loss.detach())
+            epoch_nlls.append(nll.detach())
+            epoch_l1s.append(l1.detach())
+        loss_history.extend(t.stack(epoch_losses).tolist())
+        cross_entropy_loss_history.extend(t.stack(epoch_nlls).tolist())
+        l1_loss_history.extend(t.stack(epoch_l1s).tolist())
+        desc = (
+            f"Loss: {loss_history[-1]:.3f} "
+            f"NLL: {cross_entropy_loss_history[-1]:.3f} L1: {l1_loss_history[-1]:.3f}"
+        )
+        epoch_pbar.set_description_str(f"Epoch: {epoch} " + desc)
 
     if False:
         for layer, sae in enumerate(autoencoder_model.sparse_autoencoders):
@@ -44,7 +44,6 @@ def train_model(
     n_epochs: int,
 ) -> ProjectorTransformer:
     model.eval()
-    device = model.cfg.device
 
     batch_diverge_idx = next(iter(dataloader)).batch_diverge_idx
     print("train_batch.batch_diverge_idx:", batch_diverge_idx)
@@ -53,7 +52,7 @@ def train_model(
     default_logprobs: Dict[BatchKey, t.Tensor] = {}
     kv_caches = {}
     for batch in (batch_pbar := tqdm(dataloader)):
-        tks = batch.clean.to(device)
+        tks = batch.clean  # Already on the model's device
         batch_size = tks.shape[0]
         kv_cache = HookedTransformerKeyValueCache.init_cache(
             model.cfg, model.cfg.device, batch_size
@@ -97,8 +96,10 @@ def train_model(
 
     loss_history, kl_loss_history, regularize_loss_history = [], [], []
     for epoch in (epoch_pbar := tqdm(range(n_epochs))):
-        for batch in (batch_pbar := tqdm(dataloader)):
-            toks = batch.clean.to(device)
+        # Accumulate detached tensors and only sync with the GPU at epoch end
+        epoch_losses, epoch_kls, epoch_regs = [], [], []
+        for batch in tqdm(dataloader):
+            toks = batch.clean  # Already on the model's device
             kv_cache = kv_caches[toks.shape[0]]
             toks = toks[:, batch.batch_diverge_idx :]
             optim.zero_grad()
@@ -125,12 +126,17 @@ def train_model(
             loss = kl + reg * regularize_lambda
             loss.backward()
             optim.step()
-            loss_history.append(loss.item())
-            kl_loss_history.append(kl.item())
-            regularize_loss_history.append(reg.item())
-            desc = f"Loss: {loss.item():.3f} KL: {kl.item():.3f} Reg: {reg.item():.3f}"
-            batch_pbar.set_description_str(desc)
-            epoch_pbar.set_description_str(f"Epoch: {epoch} " + desc)
+            epoch_losses.append(loss.detach())
+            epoch_kls.append(kl.detach())
+            epoch_regs.append(reg.detach())
+        loss_history.extend(t.stack(epoch_losses).tolist())
+        kl_loss_history.extend(t.stack(epoch_kls).tolist())
+        regularize_loss_history.extend(t.stack(epoch_regs).tolist())
+        desc = (
+            f"Loss: {loss_history[-1]:.3f} "
+            f"KL: {kl_loss_history[-1]:.3f} Reg: {regularize_loss_history[-1]:.3f}"
+        )
+        epoch_pbar.set_description_str(f"Epoch: {epoch} " + desc)
 
     data = {
         "Epoch": list(range(len(loss_history))),
@@ -205,7 +211,7 @@ projected_logprobs = []
 test_kv_caches = {}
 dataloader = test_dataloader
 for batch in (batch_pbar := tqdm(dataloader)):
-    tks = batch.clean.to(model.cfg.device)
+    tks = batch.clean  # Already on the model's device
     batch_size = tks.shape[0]
     kv_cache = HookedTransformerKeyValueCache.init_cache(
         model.cfg, model.cfg.device, batch_size
@@ -277,13 +283,17 @@ for projector in projector_model.projectors:
 activations = []
 answers = []
 labels = []
+# Only cache the hooks wrapped by the projectors, not every hook in the model
+projector_hooks = set(p.wrapped_hook.name for p in projector_model.projectors)
 for batch in train_dataloader:
     answers.extend(model.to_string(batch.answers))
     labels.extend(
         model.to_string(batch.clean[:, batch_diverge_idx : batch_diverge_idx + 3])
     )
     with t.inference_mode():
-        _, cache = model.run_with_cache(batch.clean)
+        _, cache = model.run_with_cache(
+            batch.clean, names_filter=lambda name: name in projector_hooks
+        )
     for idx, projector in enumerate(projector_model.projectors):
         act = cache[projector.wrapped_hook.name]
         if act.ndim == 4:
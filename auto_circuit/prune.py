@@ -8,7 +8,6 @@ from auto_circuit.types import (
     AblationType,
     CircuitOutputs,
     PatchType,
-    PatchWrapper,
     PruneScores,
 )
 from auto_circuit.utils.ablation_activations import src_ablations
@@ -16,7 +15,6 @@ from auto_circuit.utils.custom_tqdm import tqdm
 from auto_circuit.utils.graph_utils import (
     patch_mode,
 )
-from auto_circuit.utils.misc import module_by_name
 from auto_circuit.utils.patchable_model import PatchableModel
 from auto_circuit.utils.tensor_ops import desc_prune_scores, prune_scores_threshold
 from auto_circuit.visualize import draw_seq_graph
@@ -62,22 +60,22 @@ def run_circuits(
     if ablation_type.mean_over_dataset:
         patch_src_outs = src_ablations(model, dataloader, ablation_type)
 
+    # The patch type picks the branch taken for every batch and every module below,
+    # so decide it once here
+    if patch_type not in (PatchType.EDGE_PATCH, PatchType.TREE_PATCH):
+        raise NotImplementedError(patch_type)
+    edge_patch = patch_type is PatchType.EDGE_PATCH
+
     for batch_idx, batch in enumerate(batch_pbar := tqdm(dataloader)):
         batch_pbar.set_description_str(f"Pruning Batch {batch_idx}", refresh=True)
-        if (patch_type == PatchType.TREE_PATCH and not reverse_clean_corrupt) or (
-            patch_type == PatchType.EDGE_PATCH and reverse_clean_corrupt
-        ):
+        if edge_patch == reverse_clean_corrupt:
             batch_input = batch.clean
             if not ablation_type.mean_over_dataset:
                 patch_src_outs = src_ablations(model, batch.corrupt, ablation_type)
-        elif (patch_type == PatchType.EDGE_PATCH and not reverse_clean_corrupt) or (
-            patch_type == PatchType.TREE_PATCH and reverse_clean_corrupt
-        ):
+        else:
             batch_input = batch.corrupt
             if not ablation_type.mean_over_dataset:
                 patch_src_outs = src_ablations(model, batch.clean, ablation_type)
-        else:
-            raise NotImplementedError
 
         assert patch_src_outs is not None
         with patch_mode(model, patch_src_outs):
@@ -87,14 +85,12 @@ def run_circuits(
                 # When prune_scores are tied we can't prune exactly edge_count edges
                 patch_edge_count = 0
                 for mod_name, patch_mask in prune_scores.items():
-                    dest = module_by_name(model, mod_name)
-                    assert isinstance(dest, PatchWrapper)
+                    dest = model.wrapper_dict[mod_name]
                     assert dest.is_dest and dest.patch_mask is not None
-                    if patch_type == PatchType.EDGE_PATCH:
+                    if edge_patch:
                         dest.patch_mask.data = (patch_mask.abs() >= threshold).float()
                         patch_edge_count += dest.patch_mask.int().sum().item()
                     else:
-                        assert patch_type == PatchType.TREE_PATCH
                         dest.patch_mask.data = (patch_mask.abs() < threshold).float()
                         patch_edge_count += (1 - dest.patch_mask.int()).sum().item()
                 with t.inference_mode():
@@ -1,7 +1,7 @@
 from copy import deepcopy
 from itertools import product
 from random import random
-from typing import Callable, List, Literal, Optional, Set
+from typing import Callable, Dict, List, Literal, Optional, Set
 
 import torch as t
 from ordered_set import OrderedSet
@@ -83,6 +83,14 @@ def acdc_prune_scores(
     edges: OrderedSet[Edge] = OrderedSet(
         sorted(model.edges, key=lambda x: x.dest.layer, reverse=True)
     )
+    # Transformer block index of each dest node, so the forward pass for each edge can
+    # start at the block containing the edge (Node.layer counts attn and MLP layers
+    # separately, so we parse the block index out of the module name instead).
+    dest_block_idxs: Dict[Edge, int] = {}
+    if model.is_transformer:
+        dest_block_idxs = {
+            edge: int(edge.dest.module_name.split(".")[1]) for edge in edges
+        }
 
     prune_scores = model.new_prune_scores(init_val=t.inf)
     for tao in (
@@ -101,8 +109,12 @@ def acdc_prune_scores(
             toks, short_embd, attn_mask, resids = None, None, None, []
             if model.is_transformer:
                 _, toks, short_embd, attn_mask = model.input_to_embed(clean_batch)
-                _, cache = model.run_with_cache(clean_batch)
                 n_layers = range(model.cfg.n_layers)
+                resid_hooks = set(f"blocks.{i}.hook_resid_pre" for i in n_layers)
+                # Only cache the residual streams, not every hook in the model
+                _, cache = model.run_with_cache(
+                    clean_batch, names_filter=lambda name: name in resid_hooks
+                )
                 resids = [cache[f"blocks.{i}.hook_resid_pre"].clone() for i in n_layers]
                 del cache
 
@@ -122,7 +134,7 @@ def acdc_prune_scores(
                 edge.patch_mask(model).data[edge.patch_idx] = 1.0
                 with t.inference_mode():
                     if model.is_transformer:
-                        start_layer = int(edge.dest.module_name.split(".")[1])
+                        start_layer = dest_block_idxs[edge]
                         out = model(
                             resids[start_layer],
                             start_at_layer=start_layer,
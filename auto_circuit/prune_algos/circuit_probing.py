@@ -83,6 +83,10 @@ def circuit_probing_prune_scores(
         )
         assert all([t.all(ps >= 0) for ps in new_prune_scores.values()])
         threshold = prune_scores_threshold(new_prune_scores, size)
+        if len(sorted_circuit_sizes) == 1:
+            # Single size: edges in the circuit score 1, all others 0. Skips the
+            # accumulation pass over the existing scores below.
+            return {m: (ps >= threshold).float() for m, ps in new_prune_scores.items()}
         score = len(sorted_circuit_sizes) - size_idx
         for mod, new_ps in new_prune_scores.items():
             curr_ps = prune_scores[mod]
@@ -90,8 +90,14 @@ def edge_attribution_patching_prune_scores(
         loss.backward()
         model.reset_hooks()
 
-        _, corrupt_cache = model.run_with_cache(batch.corrupt, return_type="logits")
-        _, clean_cache = model.run_with_cache(batch.clean, return_type="logits")
+        # Only cache the SrcNode outputs, not every hook in the model
+        src_hooks = set(src.module_name for src in model.srcs)
+        _, corrupt_cache = model.run_with_cache(
+            batch.corrupt, return_type="logits", names_filter=lambda n: n in src_hooks
+        )
+        _, clean_cache = model.run_with_cache(
+            batch.clean, return_type="logits", names_filter=lambda n: n in src_hooks
+        )
 
         for edge in model.edges:
             if edge.dest.head_idx is None:
@@ -76,7 +76,7 @@ def mask_gradient_prune_scores(
                 set_all_masks(model, val=mask_val)
 
             for batch in dataloader:
-                patch_src_outs = src_outs[batch.key].clone().detach()
+                patch_src_outs = src_outs[batch.key]
                 with patch_mode(model, patch_src_outs):
                     logits = model(batch.clean)[out_slice]
                     if grad_function == "logit":
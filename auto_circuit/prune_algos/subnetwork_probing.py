@@ -4,7 +4,7 @@
 # https://arxiv.org/abs/2104.03514
 
 import math
-from typing import Dict, Literal, Optional, Set
+from typing import Dict, List, Literal, Optional, Set, Tuple
 
 import plotly.graph_objects as go
 import torch as t
@@ -143,13 +143,27 @@ def subnetwork_probing_prune_scores(
     with train_mask_mode(model) as patch_masks, mask_fn_mode(model, mask_fn, dropout_p):
         mask_params = patch_masks.values()
         optim = t.optim.Adam(mask_params, lr=learning_rate)
+        # Group the banned edges by module so the penalty is a single gather per
+        # module, rather than a scalar index (and autograd Select op) per edge
+        mod_avoid_idxs: Dict[str, List[Tuple[int, ...]]] = {}
+        for edge in avoid_edges or []:
+            mod_avoid_idxs.setdefault(edge.dest.module_name, []).append(edge.patch_idx)
+        avoid_patch_idxs: Dict[str, Tuple[t.Tensor, ...]] = {}
+        for mod_name, patch_idxs in mod_avoid_idxs.items():
+            device = patch_masks[mod_name].device
+            avoid_patch_idxs[mod_name] = tuple(
+                t.tensor(dim_idxs, device=device) for dim_idxs in zip(*patch_idxs)
+            )
         for epoch in (epoch_pbar := tqdm(range(epochs))):
             faith_str = f"{faithfulness_target}: {faiths[-1]:.3f}" if epoch > 0 else ""
             desc = f"Loss: {losses[-1]:.3f}, {faith_str}" if epoch > 0 else ""
             epoch_pbar.set_description_str(f"{SP} Epoch {epoch} " + desc, refresh=False)
+            # Accumulate detached tensors and only sync with the GPU at epoch end
+            epoch_losses, epoch_faiths, epoch_regs = [], [], []
+            epoch_val_faiths, epoch_val_stds = [], []
             for batch_idx, batch in enumerate(dataloader):
                 input_batch = batch.clean if tree_optimisation else batch.corrupt
-                patch_outs = src_outs[batch.key].clone().detach()
+                patch_outs = src_outs[batch.key]
                 with patch_mode(model, patch_outs):
                     train_logits = model(input_batch)[out_slice]
                     if faithfulness_target == "kl_div":
@@ -173,26 +187,33 @@ def subnetwork_probing_prune_scores(
                         faithful_term = -batch_avg_answer_val(
                             train_logits, batch, wrong
                         )
-                    masks = t.cat([patch_mask.flatten() for patch_mask in mask_params])
+                    # Samples are elementwise independent, so sampling each mask
+                    # separately avoids concatenating every mask tensor each step
                     if mask_fn == "hard_concrete":
-                        masks = sample_hard_concrete(masks, batch_size=1)
+                        mask_sums = [
+                            sample_hard_concrete(mask, batch_size=1).sum()
+                            for mask in mask_params
+                        ]
                     elif mask_fn == "sigmoid":
-                        masks = t.sigmoid(masks)
-                    n_mask = n_edges - masks.sum() if tree_optimisation else masks.sum()
+                        mask_sums = [t.sigmoid(mask).sum() for mask in mask_params]
+                    else:
+                        mask_sums = [mask.sum() for mask in mask_params]
+                    mask_count = t.stack(mask_sums).sum()
+                    n_mask = n_edges - mask_count if tree_optimisation else mask_count
                     if circuit_size:
                         n_mask = t.relu(n_mask - circuit_size)
                     regularize = n_mask / (circuit_size if circuit_size else n_edges)
-                    for edge in avoid_edges or []:  # Penalize banned edges
+                    for mod_name, idxs in avoid_patch_idxs.items():  # Banned edges
                         wgt = (-1 if tree_optimisation else 1) * avoid_lambda / n_avoid
-                        penalty = edge.patch_mask(model)[edge.patch_idx]
+                        penalties = patch_masks[mod_name][idxs]
                         const = regularize_const if mask_fn == "hard_concrete" else 0.0
                         if mask_fn is not None:
-                            penalty = t.sigmoid(penalty - const)
-                        regularize += wgt * penalty
+                            penalties = t.sigmoid(penalties - const)
+                        regularize += wgt * penalties.sum()
                     loss = faithful_term + regularize * regularize_lambda
-                    losses.append(loss.item())
-                    faiths.append(faithful_term.item())
-                    regularizes.append(regularize.item() * regularize_lambda)
+                    epoch_losses.append(loss.detach())
+                    epoch_faiths.append(faithful_term.detach())
+                    epoch_regs.append(regularize.detach() * regularize_lambda)
                     model.zero_grad()
                     loss.backward()
                     optim.step()
@@ -205,7 +226,7 @@ def subnetwork_probing_prune_scores(
                     ):
                         if validation_idx == batch_idx:
                             val_batch = validation_batch
-                    val_patch_outs = val_src_outs[val_batch.key].clone().detach()
+                    val_patch_outs = val_src_outs[val_batch.key]
                     with patch_mode(model, val_patch_outs), t.no_grad():
                         val_input_batch = (
                             val_batch.clean if tree_optimisation else val_batch.corrupt
@@ -216,8 +237,14 @@ def subnetwork_probing_prune_scores(
                             val_clean_logits[val_batch.key],
                             val_batch,
                         )
-                        val_stds.append(t.std(val_faithful_term).item())
-                        val_faiths.append(val_faithful_term.mean().item())
+                        epoch_val_stds.append(t.std(val_faithful_term))
+                        epoch_val_faiths.append(val_faithful_term.mean())
+            losses.extend(t.stack(epoch_losses).tolist())
+            faiths.extend(t.stack(epoch_faiths).tolist())
+            regularizes.extend(t.stack(epoch_regs).tolist())
+            if len(epoch_val_faiths) > 0:
+                val_faiths.extend(t.stack(epoch_val_faiths).tolist())
+                val_stds.extend(t.stack(epoch_val_stds).tolist())
 
         xtreme_f = max if tree_optimisation else min
         xtreme_torch_f = t.max if tree_optimisation else t.min
@@ -1,6 +1,6 @@
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from enum import Enum
+from dataclasses import dataclass, field, fields
+from enum import IntEnum
 from typing import Any, Dict, List, Literal, Optional, Tuple
 
 import plotly.io as pio
@@ -62,7 +62,7 @@ template.layout.font.size = 19  # type: ignore
 pio.templates.default = "plotly"
 
 
-class EdgeCounts(Enum):
+class EdgeCounts(IntEnum):
     """Special values for [`TestEdges`][auto_circuit.types.TestEdges] that get computed
     at runtime."""
 
@@ -98,7 +98,7 @@ The slice of the output that is considered for task evaluation. For example,
 """
 
 
-class PatchType(Enum):
+class PatchType(IntEnum):
     """Whether to patch the edges in the circuit or the complement of the circuit."""
 
     EDGE_PATCH = 1
@@ -111,7 +111,7 @@ class PatchType(Enum):
         return self.name.replace("_", " ").title()
 
 
-class AblationType(Enum):
+class AblationType(IntEnum):
     """
     Type of activation with which replace an original activation during a forward pass.
     """
@@ -165,7 +165,7 @@ class AblationType(Enum):
         }
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Node:
     """
     A node in the computational graph of the model used for ablation.
@@ -197,6 +197,34 @@ class Node:
     head_dim: Optional[int] = None
     weight: Optional[str] = None
     weight_head_dim: Optional[int] = None
+    _hash: int = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Nodes are frozen and used as dict keys in the patching loops, so cache the
+        # hash (the generated __hash__ re-hashes every field on each call)
+        vals = tuple(getattr(self, f.name) for f in fields(self) if f.compare)
+        object.__setattr__(self, "_hash", hash((type(self),) + vals))
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: Any) -> bool:
+        # Nodes are constructed once per model, so identity is the common case in
+        # dict and set lookups. The straight-line field chain below avoids the tuple
+        # allocations of the dataclass-generated __eq__.
+        if self is other:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (
+            self.name == other.name
+            and self.module_name == other.module_name
+            and self.layer == other.layer
+            and self.head_idx == other.head_idx
+            and self.head_dim == other.head_dim
+            and self.weight == other.weight
+            and self.weight_head_dim == other.weight_head_dim
+        )
 
     def module(self, model: Any) -> PatchWrapper:
         """
@@ -209,6 +237,9 @@ class Node:
         Returns:
             The `PatchWrapper` for this node.
         """
+        wrapper_dict = getattr(model, "wrapper_dict", None)
+        if wrapper_dict is not None:  # Wrapper refs captured at graph build time
+            return wrapper_dict[self.module_name]
         patch_wrapper = module_by_name(model, self.module_name)
         assert isinstance(patch_wrapper, PatchWrapper)
         return patch_wrapper
@@ -220,19 +251,23 @@ class Node:
         return self.name
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class SrcNode(Node):
     """A node that is the source of an edge."""
 
     src_idx: int = 0  # Index of the node across all src nodes in all layers
 
+    __hash__ = Node.__hash__  # The dataclass decorator discards inherited hashes
 
-@dataclass(frozen=True)
+
+@dataclass(frozen=True, slots=True)
 class DestNode(Node):
     """A node that is the destination of an edge."""
 
     min_src_idx: int = 0  # min src_idx of all incoming SrcNodes (0 in factorized model)
 
+    __hash__ = Node.__hash__  # The dataclass decorator discards inherited hashes
+
 
 PruneScores = Dict[str, t.Tensor]
 """
@@ -242,7 +277,7 @@ of an incoming [`Edge`][auto_circuit.types.Edge].
 """
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Edge:
     """
     A directed edge from a [`SrcNode`][auto_circuit.types.SrcNode] to a
@@ -260,19 +295,40 @@ class Edge:
     """The [`DestNode`][auto_circuit.types.DestNode] of the edge."""
     seq_idx: Optional[int] = None
     """The sequence index of the edge."""
-
-    @property
-    def name(self) -> str:
-        """The name of the edge. Equal to `{src.name}->{dest.name}`."""
-        return f"{self.src.name}->{self.dest.name}"
-
-    @property
-    def patch_idx(self) -> Tuple[int, ...]:
-        """The index of the edge in the `patch_mask` or
-        [`PruneScores`][auto_circuit.types.PruneScores] tensor of the `dest` node."""
+    _hash: int = field(init=False, repr=False, compare=False)
+    name: str = field(init=False, repr=False, compare=False)
+    """The name of the edge. Equal to `{src.name}->{dest.name}`. Precomputed because
+    edges are frequently keyed and printed by name."""
+    patch_idx: Tuple[int, ...] = field(init=False, repr=False, compare=False)
+    """The index of the edge in the `patch_mask` or
+    [`PruneScores`][auto_circuit.types.PruneScores] tensor of the `dest` node.
+    Precomputed because the patching loops access it once per edge per iteration."""
+
+    def __post_init__(self) -> None:
+        # Edges are frozen and used as dict and set keys throughout the pruning
+        # algorithms, so cache the hash (which hashes both nodes) on construction
+        object.__setattr__(self, "_hash", hash((self.src, self.dest, self.seq_idx)))
+        object.__setattr__(self, "name", f"{self.src.name}->{self.dest.name}")
         seq_idx = [] if self.seq_idx is None else [self.seq_idx]
         head_idx = [] if self.dest.head_idx is None else [self.dest.head_idx]
-        return tuple(seq_idx + head_idx + [self.src.src_idx - self.dest.min_src_idx])
+        mask_idx = [self.src.src_idx - self.dest.min_src_idx]
+        object.__setattr__(self, "patch_idx", tuple(seq_idx + head_idx + mask_idx))
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __eq__(self, other: Any) -> bool:
+        # Edges all come from a single model.edges set, so identity is the common
+        # case in dict and set lookups
+        if self is other:
+            return True
+        if other.__class__ is not Edge:
+            return NotImplemented
+        return (
+            self.seq_idx == other.seq_idx
+            and self.src == other.src
+            and self.dest == other.dest
+        )
 
     def patch_mask(self, model: Any) -> t.nn.Parameter:
         """The `patch_mask` tensor of the `dest` node."""
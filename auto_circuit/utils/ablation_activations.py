@@ -20,14 +20,14 @@ def src_out_hook(
     ablation_type: AblationType,
 ):
     assert not ablation_type.mean_over_dataset
-    if ablation_type == AblationType.RESAMPLE:
+    if ablation_type is AblationType.RESAMPLE:
         out = out
-    elif ablation_type == AblationType.ZERO:
+    elif ablation_type is AblationType.ZERO:
         out = t.zeros_like(out)
-    elif ablation_type == AblationType.BATCH_TOKENWISE_MEAN:
+    elif ablation_type is AblationType.BATCH_TOKENWISE_MEAN:
         repeats = [out.size(0)] + [1] * (out.ndim - 1)
         out = out.mean(dim=0, keepdim=True).repeat(repeats)
-    elif ablation_type == AblationType.BATCH_ALL_TOK_MEAN:
+    elif ablation_type is AblationType.BATCH_ALL_TOK_MEAN:
         repeats = [out.size(0), out.size(1)] + [1] * (out.ndim - 2)
         out = out.mean(dim=(0, 1), keepdim=True).repeat(repeats)
     else:
@@ -395,6 +395,33 @@ def mask_fn_mode(model: PatchableModel, mask_fn: MaskFn, dropout_p: float = 0.0)
             wrapper.dropout_layer.p = 0.0  # type: ignore
 
 
+@contextmanager
+def batch_mask_mode(model: PatchableModel, batch_masks: Dict[str, t.Tensor]):
+    """
+    Context manager that overrides the patch masks of a patchable model with masks that
+    have a leading batch dimension. This makes it possible to run several mask
+    configurations in a single forward pass by stacking them (and the corresponding
+    inputs) along the batch dimension.
+
+    Args:
+        model: The patchable model to alter.
+        batch_masks: The mask for each [`DestNode`][auto_circuit.types.DestNode] module
+            (with the module name as the key). Each mask must have the shape of the
+            module's `patch_mask` with an extra leading batch dimension. Gradients flow
+            to the `patch_mask` parameters wherever the override is a function of them.
+
+    Warning:
+        This function modifies the state of the model! This is a likely source of bugs.
+    """
+    for wrapper in model.dest_wrappers:
+        wrapper.batch_mask = batch_masks[wrapper.module_name]
+    try:
+        yield
+    finally:
+        for wrapper in model.dest_wrappers:
+            wrapper.batch_mask = None
+
+
 def edge_counts_util(
     edges: Set[Edge],
     test_counts: Optional[TestEdges] = None,  # None means default
@@ -3,6 +3,7 @@ from datetime import datetime
 from functools import reduce
 from pathlib import Path
 from typing import Any, Dict, Iterator, Optional, Set
+from weakref import WeakKeyDictionary
 
 import torch as t
 from einops import einsum
@@ -76,6 +77,13 @@ def remove_hooks() -> Iterator[Set[RemovableHandle]]:
             handle.remove()
 
 
+# Cache of {module name: module} for each model, so that repeated module lookups
+# (once per edge in the patching loops) don't walk the module tree each time
+_module_dict_cache: "WeakKeyDictionary[t.nn.Module, Dict[str, t.nn.Module]]" = (
+    WeakKeyDictionary()
+)
+
+
 def module_by_name(model: Any, module_name: str) -> t.nn.Module:
     """
     Gets a module from a model by name.
@@ -87,8 +95,13 @@ def module_by_name(model: Any, module_name: str) -> t.nn.Module:
     Returns:
         The module.
     """
-    init_mod = [model.wrapped_model] if hasattr(model, "wrapped_model") else [model]
-    return reduce(getattr, init_mod + module_name.split("."))  # type: ignore
+    root = model.wrapped_model if hasattr(model, "wrapped_model") else model
+    module_dict = _module_dict_cache.get(root)
+    if module_dict is None:
+        # remove_duplicate=False so shared modules are listed under every name
+        named = root.named_modules(remove_duplicate=False)
+        _module_dict_cache[root] = module_dict = dict(named)
+    return module_dict[module_name]
 
 
 def set_module_by_name(model: Any, module_name: str, new_module: t.nn.Module):
@@ -108,6 +121,8 @@ def set_module_by_name(model: Any, module_name: str, new_module: t.nn.Module):
     if "." in module_name:
         parent = reduce(getattr, init_mod + module_name.split(".")[:-1])  # type: ignore
     setattr(parent, module_name.split(".")[-1], new_module)
+    # The module tree changed, so drop the cached name lookups for this model
+    _module_dict_cache.pop(init_mod[0], None)
 
 
 def percent_gpu_mem_used(total_gpu_mib: int = 49000) -> str:
@@ -81,6 +81,7 @@ class PatchWrapperImpl(PatchWrapper):
         if self.is_dest:
             assert patch_mask is not None
             self.patch_mask: t.nn.Parameter = t.nn.Parameter(patch_mask)
+            self.batch_mask: Optional[t.Tensor] = None
             self.patch_src_outs: Optional[t.Tensor] = None
             self.mask_fn: MaskFn = None
             self.dropout_layer: t.nn.Module = t.nn.Dropout(p=0.0)
@@ -99,14 +100,24 @@ class PatchWrapperImpl(PatchWrapper):
             batch_str = ""
             head_str = "" if self.head_dim is None else "dest"  # Patch heads separately
             seq_str = "" if self.seq_dim is None else "seq"  # Patch tokens separately
+            if self.batch_mask is not None:
+                # Mask with a leading batch dim that overrides the learned patch_mask
+                # (gradients flow to patch_mask through the override where it is used)
+                patch_mask: t.Tensor = self.batch_mask
+                batch_str = "batch"
+            else:
+                patch_mask = self.patch_mask
             if self.mask_fn == "hard_concrete":
-                mask = sample_hard_concrete(self.patch_mask, arg_0.size(0))
+                if self.batch_mask is None:
+                    mask = sample_hard_concrete(patch_mask, arg_0.size(0))
+                else:  # The mask already has a batch dim, sample each element once
+                    mask = sample_hard_concrete(patch_mask, 1).squeeze(0)
                 batch_str = "batch"  # Sample distribution for each batch element
             elif self.mask_fn == "sigmoid":
-                mask = t.sigmoid(self.patch_mask)
+                mask = t.sigmoid(patch_mask)
             else:
                 assert self.mask_fn is None
-                mask = self.patch_mask
+                mask = patch_mask
             mask = self.dropout_layer(mask)
             ein_pre = f"{batch_str} {seq_str} {head_str} src, src batch {self.dims} ..."
             ein_post = f"batch {self.dims} {head_str} ..."
@@ -120,8 +131,9 @@ class PatchWrapperImpl(PatchWrapper):
             if self.head_dim is None:
                 src_out = out
             else:
-                squeeze_dim = self.head_dim if self.head_dim < 0 else self.head_dim + 1
-                src_out = t.stack(out.split(1, dim=self.head_dim)).squeeze(squeeze_dim)
+                # View with the head dim first, equivalent to splitting out each head
+                # and stacking, but without a Python loop over heads or a new tensor
+                src_out = out.movedim(self.head_dim, 0)
             self.curr_src_outs[self.src_idxs] = src_out
 
         return out
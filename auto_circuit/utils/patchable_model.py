@@ -69,6 +69,7 @@ class PatchableModel(t.nn.Module):
     wrappers: Set[PatchWrapperImpl]
     src_wrappers: Set[PatchWrapperImpl]
     dest_wrappers: Set[PatchWrapperImpl]
+    wrapper_dict: Dict[str, PatchWrapperImpl]
     patch_masks: Dict[str, t.nn.Parameter]
     out_slice: Tuple[slice | int, ...]
     is_factorized: bool
@@ -111,6 +112,9 @@ class PatchableModel(t.nn.Module):
         self.wrappers = wrappers
         self.src_wrappers = src_wrappers
         self.dest_wrappers = dest_wrappers
+        # Wrapper references by module name, so node and edge lookups don't have to
+        # resolve names against the module tree on every call
+        self.wrapper_dict = {w.module_name: w for w in wrappers}
         self.patch_masks = {}
         for dest_wrapper in self.dest_wrappers:
             self.patch_masks[dest_wrapper.module_name] = dest_wrapper.patch_mask
@@ -0,0 +1,122 @@
+#%%
+from typing import Dict
+
+import torch as t
+from pytest import approx
+
+from auto_circuit.data import PromptPairBatch
+from auto_circuit.metrics.completeness_metrics.train_same_under_knockouts import (
+    init_mask_val,
+)
+from auto_circuit.model_utils.micro_model_utils import MicroModel
+from auto_circuit.tasks import Task
+from auto_circuit.types import AblationType, PruneScores
+from auto_circuit.utils.ablation_activations import batch_src_ablations
+from auto_circuit.utils.graph_utils import (
+    batch_mask_mode,
+    mask_fn_mode,
+    patch_mode,
+    set_all_masks,
+    train_mask_mode,
+)
+from auto_circuit.utils.tensor_ops import prune_scores_threshold, sample_hard_concrete
+
+
+def test_fused_knockout_step_matches_sequential(micro_model: MicroModel):
+    """The fused knockout training step (both mask configurations stacked along the
+    batch dim) must match the original sequential formulation: the same circuit and
+    full-model outputs, and a knockout count to which non-circuit edges (whose raw
+    mask values are no longer overwritten in place) contribute exactly nothing."""
+    task = Task(
+        key="test_train_same_under_knockouts",
+        name="test_train_same_under_knockouts",
+        batch_size=2,
+        batch_count=1,
+        token_circuit=False,
+        _model_def=micro_model,
+        _dataset_name="micro_model_inputs",
+    )
+    model = task.model
+    circuit_size = model.n_edges // 2
+
+    corrupt_src_outs = batch_src_ablations(
+        model,
+        task.test_loader,
+        ablation_type=AblationType.RESAMPLE,
+        clean_corrupt="corrupt",
+    )
+    batch: PromptPairBatch = next(iter(task.test_loader))
+    patches = corrupt_src_outs[batch.key]
+
+    with train_mask_mode(model) as patch_masks:
+        mask_params = list(patch_masks.values())
+        t.manual_seed(0)
+        algo_ps: PruneScores = {
+            mod_name: t.rand_like(mask.data) for mod_name, mask in patch_masks.items()
+        }
+        circuit_threshold = prune_scores_threshold(algo_ps, circuit_size)
+        circ_masks = [algo_ps[m].abs() >= circuit_threshold for m in patch_masks]
+        not_circ_masks = [~circ for circ in circ_masks]
+        set_all_masks(model, val=-init_mask_val)
+
+        # Fused pass: override the non-circuit mask entries per batch half (99 patches
+        # everything outside the circuit, -99 patches nothing). "sigmoid" is used
+        # because it is deterministic, unlike "hard_concrete".
+        doubled_patches = t.cat([patches, patches], dim=1)  # Batch dim is 1
+        doubled_clean = t.cat([batch.clean, batch.clean], dim=0)
+        half_consts = t.cat(
+            [
+                t.full((batch.clean.size(0),), 99.0, device=patches.device),
+                t.full((batch.clean.size(0),), -99.0, device=patches.device),
+            ]
+        )
+        batch_masks: Dict[str, t.Tensor] = {}
+        for (mod_name, patch), not_circ in zip(patch_masks.items(), not_circ_masks):
+            consts = half_consts.view(-1, *([1] * patch.ndim))
+            batch_masks[mod_name] = t.where(not_circ, consts, patch)
+        with patch_mode(model, doubled_patches), mask_fn_mode(model, "sigmoid"):
+            with batch_mask_mode(model, batch_masks), t.no_grad():
+                out = model(doubled_clean)[model.out_slice]
+        fused_circ_out, fused_model_out = out.chunk(2, dim=0)
+
+        # Sequential passes: discretize the masks in place before each forward, as
+        # the trainer did before the fusion
+        with patch_mode(model, patches), mask_fn_mode(model, "sigmoid"), t.no_grad():
+            for circ, patch in zip(circ_masks, mask_params):
+                patch_all = t.full_like(patch.data, 99.0)
+                t.where(circ, patch.data, patch_all, out=patch.data)
+            seq_circ_out = model(batch.clean)[model.out_slice]
+            for circ, patch in zip(circ_masks, mask_params):
+                patch_none = t.full_like(patch.data, -99.0)
+                t.where(circ, patch.data, patch_none, out=patch.data)
+            seq_model_out = model(batch.clean)[model.out_slice]
+
+        assert t.allclose(fused_circ_out, seq_circ_out, atol=1e-5)
+        assert t.allclose(fused_model_out, seq_model_out, atol=1e-5)
+
+        # The regularizer's knockout count must also match: the fused step samples
+        # the raw masks with non-circuit entries forced to -99, which must equal
+        # sampling the in-place discretized masks (currently -99 outside the circuit)
+        set_all_masks(model, val=-init_mask_val)
+        t.manual_seed(0)
+        fused_count = t.stack(
+            [
+                sample_hard_concrete(m.masked_fill(nc, -99.0), batch_size=1).sum()
+                for m, nc in zip(mask_params, not_circ_masks)
+            ]
+        ).sum()
+        with t.no_grad():
+            for circ, patch in zip(circ_masks, mask_params):
+                patch_none = t.full_like(patch.data, -99.0)
+                t.where(circ, patch.data, patch_none, out=patch.data)
+        t.manual_seed(0)
+        seq_count = t.stack(
+            [sample_hard_concrete(m, batch_size=1).sum() for m in mask_params]
+        ).sum()
+        assert fused_count.item() == approx(seq_count.item())
+        # Non-circuit edges sample to exactly 0, so they never eat into the budget
+        assert sample_hard_concrete(t.full((100,), -99.0), batch_size=1).eq(0).all()
+
+
+# micro_model = micro_model()
+# test_fused_knockout_step_matches_sequential(micro_model)
@@ -2,7 +2,6 @@
 from typing import Any
 
 import pytest
-import torch as t
 
 from auto_circuit.prune import run_circuits
 from auto_circuit.prune_algos.ACDC import acdc_prune_scores
@@ -10,29 +9,36 @@ from auto_circuit.tasks import Task
 from auto_circuit.visualize import draw_seq_graph
 
 
+@pytest.fixture(scope="session")
+def acdc_task(request: Any) -> Task:
+    # Session-scoped and parametrized indirectly, so each (model, dataset) Task is
+    # built once per session however many times the parametrize cases run
+    model_fixture, dataset_name = request.param
+    return Task(
+        key="test_acdc",
+        name="test_acdc",
+        batch_size=1,
+        batch_count=1,
+        token_circuit=False,
+        _model_def=request.getfixturevalue(model_fixture),
+        _dataset_name=dataset_name,
+    )
+
+
 @pytest.mark.parametrize(
-    "model, dataset_name",
+    "acdc_task",
     [
         ("micro_model", "micro_model_inputs"),
         ("mini_tl_transformer", "mini_prompts"),
     ],
+    indirect=True,
+    ids=["micro_model-micro_model_inputs", "mini_tl_transformer-mini_prompts"],
 )
 def test_acdc(
-    model: t.nn.Module,
-    dataset_name: str,
-    request: Any,
+    acdc_task: Task,
     show_graphs: bool = False,  # Useful for debugging
 ):
-    fixture_model = request.getfixturevalue(model) if request else model
-    task = Task(
-        key="test_acdc",
-        name="test_acdc",
-        batch_size=1,
-        batch_count=1,
-        token_circuit=False,
-        _model_def=fixture_model,
-        _dataset_name=dataset_name,
-    )
+    task = acdc_task
     acdc_prune_scores(
         model=task.model,
         dataloader=task.train_loader,
@@ -46,8 +52,5 @@ def test_acdc(
     )
 
 
-# model = micro_model()
-# dataset_name = "micro_model_inputs"
-# model = mini_tl_transformer()
-# dataset_name = "mini_prompts"
-# test_acdc(model, dataset_name, request=None, show_graphs=True)
+# task = acdc_task (build a Task from micro_model() or mini_tl_transformer() directly)
+# test_acdc(task, show_graphs=True)